@@ -8,21 +8,40 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Any, Optional
+import logging
 import re
 
 from settings import get_settings
 from db import get_connection, get_s3_base
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize DuckDB connection on startup."""
+    """Initialize DuckDB connection and prewarm hot objects on startup."""
     get_connection()
+    if settings.prewarm_enabled:
+        prewarm()
     yield
 
 
 settings = get_settings()
 
+# Identical concurrent reads share one S3 fetch; results kept for a short TTL
+_parquet_reads = SingleFlight(
+    ttl_s=settings.parquet_cache_ttl_s, max_entries=settings.parquet_cache_max_entries
+)
+
+# Prewarmed hot objects, kept until their S3 metadata changes: path -> ((size, last_modified), rows)
+_pinned: dict[str, tuple[tuple[int, int] | None, list[dict]]] = {}
+_object_versions = SingleFlight()
+
+# SoH trend fits per SoH file, keyed by path -> ((size, last_modified), fit or None if unfittable)
+_soh_fits: dict[str, tuple[tuple[int, int], dict[str, Any] | None]] = {}
+_soh_refresh = SingleFlight()
+
 app = FastAPI(
     title=settings.app_name,
     description="Full-featured analytics API for drone telemetry",
@@ -40,13 +59,43 @@ app.add_middleware(
 )
 
 
-def query_parquet(s3_path: str) -> list[dict]:
-    """Read parquet file from S3 and return as list of dicts."""
+def _read_parquet(s3_path: str) -> list[dict]:
+    """Read parquet file from S3 in a single pass and return as list of dicts."""
+    conn = get_connection()
+    cursor = conn.execute(f"SELECT * FROM read_parquet('{s3_path}')")
+    columns = [desc[0] for desc in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def _object_version(s3_path: str) -> tuple[int, int] | None:
+    """Size and last-modified time of one S3 object (metadata only, no content read)."""
     conn = get_connection()
+    row = conn.execute(f"SELECT size, epoch_ms(last_modified) FROM read_blob('{s3_path}')").fetchone()
+    return (row[0], row[1]) if row else None
+
+
+def _pin(s3_path: str) -> list[dict]:
+    """Read an object and keep it pinned under its current version."""
+    version = _object_versions.do(s3_path, lambda: _object_version(s3_path))
+    cached = _pinned.get(s3_path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    rows = _parquet_reads.do(s3_path, lambda: _read_parquet(s3_path))
+    _pinned[s3_path] = (version, rows)
+    return rows
+
+
+def query_parquet(s3_path: str) -> list[dict]:
+    """Read parquet file from S3 and return as list of dicts.
+    
+    Concurrent calls for the same path are coalesced into one read.
+    Pinned (prewarmed) objects are served from memory until their metadata changes.
+    The returned rows are shared between callers and must not be mutated.
+    """
     try:
-        result = conn.execute(f"SELECT * FROM read_parquet('{s3_path}')").fetchall()
-        columns = [desc[0] for desc in conn.execute(f"SELECT * FROM read_parquet('{s3_path}') LIMIT 0").description]
-        return [dict(zip(columns, row)) for row in result]
+        if s3_path in _pinned:
+            return _pin(s3_path)
+        return _parquet_reads.do(s3_path, lambda: _read_parquet(s3_path))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Query failed: {e}")
 
@@ -66,17 +115,55 @@ def list_s3_files(prefix: str, pattern: str = "") -> list[str]:
         return []
 
 
+def latest_days(files: list[str]) -> dict[str, int]:
+    """Latest day index per drone from a listing of daily feature files."""
+    latest: dict[str, int] = {}
+    for f in files:
+        match = re.search(r'features_daily_([^/]+)_day_(\d+)\.parquet$', f)
+        if match:
+            drone_id, day = match.group(1), int(match.group(2))
+            latest[drone_id] = max(latest.get(drone_id, 0), day)
+    return latest
+
+
 def get_latest_day(drone_id: str) -> int:
     """Get the latest day index for a drone from daily features."""
     files = list_s3_files("daily", f"features_daily_{drone_id}_day_")
-    if not files:
-        return 0
-    days = []
-    for f in files:
-        match = re.search(r'_day_(\d+)\.parquet$', f)
-        if match:
-            days.append(int(match.group(1)))
-    return max(days) if days else 0
+    return latest_days(files).get(drone_id, 0)
+
+
+def prewarm() -> None:
+    """Pin configured hot objects before serving traffic.
+    
+    Pinned objects stay in memory and are revalidated against S3 metadata on
+    each request, so they do not expire with the short read cache.
+    """
+    s3_base = get_s3_base()
+    for key in settings.prewarm_objects:
+        try:
+            _pin(f"{s3_base}/{key.lstrip('/')}")
+        except Exception as e:
+            logger.warning("Prewarm failed for %s: %s", key, e)
+    
+    if not settings.prewarm_latest_daily:
+        return
+    
+    try:
+        fleet = query_parquet(f"{s3_base}/aggregated/features_daily_fleet_with_lifetime.parquet")
+    except HTTPException as e:
+        logger.warning("Prewarm skipped latest daily files: %s", e.detail)
+        return
+    
+    # One listing of daily/ instead of a glob per drone
+    latest = latest_days(list_s3_files("daily"))
+    for drone_id in sorted(set(d.get("drone_id") for d in fleet if d.get("drone_id"))):
+        latest_day = latest.get(drone_id, 0)
+        if latest_day == 0:
+            continue
+        try:
+            _pin(f"{s3_base}/daily/features_daily_{drone_id}_day_{str(latest_day).zfill(2)}.parquet")
+        except Exception as e:
+            logger.warning("Prewarm failed for %s day %s: %s", drone_id, latest_day, e)
 
 
 # --------------------------------------------------------------------------
@@ -344,6 +431,148 @@ def get_fleet_aggregated() -> dict[str, Any]:
     }
 
 
+# --------------------------------------------------------------------------
+# Fleet SoH Trends (SoH vs EFC_lifetime)
+# --------------------------------------------------------------------------
+
+def _soh_file_versions() -> dict[str, tuple[int, int]]:
+    """Size and last-modified time of every per-drone SoH file (metadata only)."""
+    conn = get_connection()
+    glob_path = f"{get_s3_base()}/SoH/features_daily_*_with_SoH.parquet"
+    rows = conn.execute(
+        f"SELECT filename, size, epoch_ms(last_modified) FROM read_blob('{glob_path}')"
+    ).fetchall()
+    return {f: (size, mtime) for f, size, mtime in rows if not f.endswith("_fleet_with_SoH.parquet")}
+
+
+# Two-sided 95% Student-t critical values by degrees of freedom (df above the last key uses 1.96)
+_T_CRITICAL_95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262,
+    10: 2.228, 12: 2.179, 15: 2.131, 20: 2.086, 25: 2.060, 30: 2.042, 40: 2.021, 60: 2.000, 120: 1.980,
+}
+
+
+def _t_critical_95(df: int) -> float:
+    """Critical value for the nearest tabulated df at or below df (conservative)."""
+    if df > max(_T_CRITICAL_95):
+        return 1.96
+    return _T_CRITICAL_95[max(k for k in _T_CRITICAL_95 if k <= df)]
+
+
+def _eol_interval(
+    eol: float, intercept: float, slope: float, slope_stderr: float | None, n: int
+) -> tuple[float | None, float | None]:
+    """95% interval for the end-of-life EFC from the slope's uncertainty.
+    
+    The upper bound is None when a flat or rising slope is within the interval.
+    """
+    if slope_stderr is None or n < 3:
+        return None, None
+    margin = _t_critical_95(n - 2) * slope_stderr
+    steep, shallow = slope - margin, slope + margin
+    low = (eol - intercept) / steep
+    high = (eol - intercept) / shallow if shallow < 0 else None
+    return low, high
+
+
+def _query_soh_fits(files: list[str]) -> dict[str, dict[str, Any]]:
+    """Fit SoH = intercept + slope * EFC_lifetime for each file in one grouped query."""
+    conn = get_connection()
+    file_list = ", ".join(f"'{f}'" for f in files)
+    rows = conn.execute(f"""
+        SELECT
+            filename,
+            regr_slope(SoH, EFC_lifetime),
+            regr_intercept(SoH, EFC_lifetime),
+            regr_r2(SoH, EFC_lifetime),
+            regr_count(SoH, EFC_lifetime),
+            regr_sxx(SoH, EFC_lifetime),
+            regr_syy(SoH, EFC_lifetime),
+            max(EFC_lifetime),
+            arg_max(SoH, day_index)
+        FROM read_parquet([{file_list}], filename = true, union_by_name = true)
+        GROUP BY filename
+    """).fetchall()
+    
+    eol = settings.soh_eol_threshold
+    fits = {}
+    for f, slope, intercept, r2, n, sxx, syy, efc_now, soh_now in rows:
+        match = re.search(r'features_daily_(.+)_with_SoH\.parquet$', f)
+        eol_efc = (eol - intercept) / slope if slope is not None and slope < 0 else None
+        slope_stderr = None
+        if slope is not None and r2 is not None and n > 2 and sxx:
+            slope_stderr = ((1 - r2) * syy / ((n - 2) * sxx)) ** 0.5
+        eol_low, eol_high = (
+            _eol_interval(eol, intercept, slope, slope_stderr, n) if eol_efc is not None else (None, None)
+        )
+        fits[f] = {
+            "drone_id": match.group(1) if match else f,
+            "slope": slope,
+            "intercept": intercept,
+            "r2": r2,
+            "slope_stderr": slope_stderr,
+            "points": n,
+            "current_EFC_lifetime": efc_now,
+            "current_SoH": soh_now,
+            "eol_EFC": eol_efc,
+            "eol_EFC_low": eol_low,
+            "eol_EFC_high": eol_high,
+            "remaining_EFC": max(eol_efc - efc_now, 0.0) if eol_efc is not None and efc_now is not None else None,
+        }
+    return fits
+
+
+def _fit_soh_trends(files: list[str]) -> dict[str, dict[str, Any] | None]:
+    """Fit all files in one query; if that fails, fit each file on its own.
+    
+    Only certain outcomes are returned: a fit, or None when the query succeeded
+    but the file produced no rows. Files whose query raised (possibly a transient
+    S3 error) are left out so the next request retries them.
+    """
+    try:
+        fits = _query_soh_fits(files)
+        return {f: fits.get(f) for f in files}
+    except Exception as e:
+        logger.warning("Batched SoH fit failed, fitting files individually: %s", e)
+    
+    results = {}
+    for f in files:
+        try:
+            results[f] = _query_soh_fits([f]).get(f)
+        except Exception as e:
+            logger.warning("SoH fit failed for %s, will retry: %s", f, e)
+    return results
+
+
+def _refresh_soh_trends() -> list[dict[str, Any]]:
+    """Refit only drones whose SoH file changed since the last request."""
+    versions = _soh_file_versions()
+    stale = [f for f, v in versions.items() if f not in _soh_fits or _soh_fits[f][0] != v]
+    if stale:
+        for f, fit in _fit_soh_trends(stale).items():
+            _soh_fits[f] = (versions[f], fit)
+    for f in list(_soh_fits):
+        if f not in versions:
+            del _soh_fits[f]
+    # A file whose refit failed keeps serving its previous fit, if any, until the retry succeeds
+    fits = (fit for _, fit in _soh_fits.values() if fit is not None)
+    return sorted(fits, key=lambda d: d["drone_id"])
+
+
+@app.get("/fleet/soh/trends")
+def get_fleet_soh_trends() -> dict[str, Any]:
+    """SoH degradation trend and projected end-of-life EFC for every drone."""
+    try:
+        trends = _soh_refresh.do("soh_trends", _refresh_soh_trends)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Query failed: {e}")
+    
+    if not trends:
+        raise HTTPException(status_code=404, detail="No SoH data found")
+    
+    return {"eol_SoH": settings.soh_eol_threshold, "total_drones": len(trends), "drones": trends}
+
+
 # --------------------------------------------------------------------------
 # Legacy endpoints (for backward compatibility)
 # --------------------------------------------------------------------------
@@ -17,6 +17,16 @@ class Settings(BaseSettings):
     aws_access_key_id: str | None = None
     aws_secret_access_key: str | None = None
     
+    # Read coalescing / prewarm
+    parquet_cache_ttl_s: float = 5.0  # Keep finished reads briefly; 0 = coalesce in-flight reads only
+    parquet_cache_max_entries: int = 128
+    prewarm_enabled: bool = True  # Pin hot objects on startup; revalidated per request by S3 metadata
+    prewarm_objects: list[str] = ["aggregated/features_daily_fleet_with_lifetime.parquet"]
+    prewarm_latest_daily: bool = True  # Latest daily file per drone in the fleet aggregate
+    
+    # SoH trend fits
+    soh_eol_threshold: float = 0.8  # SoH at which a pack is considered end-of-life
+    
     # App settings
     app_name: str = "Telemetry Analytics API"
     debug: bool = False
@@ -0,0 +1,67 @@
+"""
+Single-flight request coalescing with a short-lived result cache.
+Concurrent calls for the same key share one in-flight fetch.
+"""
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable
+
+
+class SingleFlight:
+    """Coalesce concurrent calls per key; optionally keep up to `max_entries` results for `ttl_s` seconds."""
+
+    def __init__(self, ttl_s: float = 0.0, max_entries: int = 128):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._inflight: dict[str, Future] = {}
+        self._results: dict[str, tuple[float, Any]] = {}
+
+    def _evict(self, now: float) -> None:
+        """Drop expired results, then the oldest ones beyond max_entries (caller holds the lock)."""
+        for key in [k for k, (expires, _) in self._results.items() if expires <= now]:
+            del self._results[key]
+        while len(self._results) > self.max_entries:
+            del self._results[next(iter(self._results))]
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Return fn() for key, sharing the call with any concurrent caller of the same key."""
+        with self._lock:
+            self._evict(time.monotonic())
+            cached = self._results.get(key)
+            if cached is not None:
+                return cached[1]
+
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            if self.ttl_s > 0 and self.max_entries > 0:
+                self._results[key] = (time.monotonic() + self.ttl_s, result)
+                self._evict(time.monotonic())
+        future.set_result(result)
+        return result
+
+    def forget(self, key: str | None = None) -> None:
+        """Drop a cached result (or all of them)."""
+        with self._lock:
+            if key is None:
+                self._results.clear()
+            else:
+                self._results.pop(key, None)
@@ -0,0 +1,6 @@
+"""
+Shared test setup: settings need an S3 bucket before main.py is imported.
+"""
+import os
+
+os.environ.setdefault("S3_BUCKET", "test-bucket")
@@ -0,0 +1,170 @@
+"""
+Tests for single-flight read coalescing.
+"""
+import threading
+import time
+
+import pytest
+
+import main
+from singleflight import SingleFlight
+
+N_CALLERS = 20
+
+
+def _run_concurrently(n: int, target) -> list:
+    """Start n threads at the same moment and collect their results."""
+    barrier = threading.Barrier(n)
+    results = []
+    lock = threading.Lock()
+
+    def worker():
+        barrier.wait()
+        value = target()
+        with lock:
+            results.append(value)
+
+    threads = [threading.Thread(target=worker) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_calls_share_one_fetch():
+    flight = SingleFlight()
+    calls = []
+
+    def slow_fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"rows": 1}
+
+    results = _run_concurrently(N_CALLERS, lambda: flight.do("key", slow_fetch))
+
+    assert len(calls) == 1
+    assert len(results) == N_CALLERS
+    assert all(r is results[0] for r in results)
+
+
+def test_concurrent_query_parquet_reads_backend_once(monkeypatch):
+    monkeypatch.setattr(main, "_parquet_reads", SingleFlight())
+    reads = []
+
+    def slow_read(s3_path):
+        reads.append(s3_path)
+        time.sleep(0.2)
+        return [{"drone_id": "ORCA001"}]
+
+    monkeypatch.setattr(main, "_read_parquet", slow_read)
+
+    results = _run_concurrently(N_CALLERS, lambda: main.query_parquet("s3://bucket/fleet.parquet"))
+
+    assert reads == ["s3://bucket/fleet.parquet"]
+    assert results == [[{"drone_id": "ORCA001"}]] * N_CALLERS
+
+
+def test_failure_propagates_and_is_not_cached():
+    flight = SingleFlight(ttl_s=60)
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise RuntimeError("boom")
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            flight.do("key", failing)
+    assert len(calls) == 2
+
+
+def test_without_ttl_results_are_not_kept():
+    flight = SingleFlight()
+    calls = []
+    flight.do("key", lambda: calls.append(1))
+    flight.do("key", lambda: calls.append(1))
+    assert len(calls) == 2
+
+
+def test_expired_results_are_evicted(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    flight = SingleFlight(ttl_s=5)
+
+    flight.do("a", lambda: 1)
+    assert flight.do("a", lambda: 2) == 1
+
+    now[0] += 10
+    flight.do("b", lambda: 3)
+    assert "a" not in flight._results
+    assert flight.do("a", lambda: 4) == 4
+
+
+def test_cache_size_is_capped():
+    flight = SingleFlight(ttl_s=60, max_entries=3)
+    for i in range(10):
+        flight.do(f"key{i}", lambda i=i: i)
+    assert list(flight._results) == ["key7", "key8", "key9"]
+
+
+def test_prewarm_lists_daily_prefix_once(monkeypatch):
+    listings = []
+    loaded = []
+    fleet = [{"drone_id": "ORCA001"}, {"drone_id": "ORCA002"}, {"drone_id": "ORCA001"}]
+
+    def fake_list(prefix, pattern=""):
+        listings.append(prefix)
+        return [
+            "s3://bucket/daily/features_daily_ORCA001_day_02.parquet",
+            "s3://bucket/daily/features_daily_ORCA001_day_15.parquet",
+            "s3://bucket/daily/features_daily_ORCA002_day_07.parquet",
+        ]
+
+    def fake_pin(s3_path):
+        loaded.append(s3_path.rsplit("/", 1)[-1])
+        return fleet
+
+    monkeypatch.setattr(main, "get_s3_base", lambda: "s3://bucket")
+    monkeypatch.setattr(main, "list_s3_files", fake_list)
+    monkeypatch.setattr(main, "query_parquet", lambda s3_path: fleet)
+    monkeypatch.setattr(main, "_pin", fake_pin)
+
+    main.prewarm()
+
+    assert listings == ["daily"]
+    assert "features_daily_ORCA001_day_15.parquet" in loaded
+    assert "features_daily_ORCA002_day_07.parquet" in loaded
+
+
+@pytest.fixture
+def pinned_backend(monkeypatch):
+    """Stub S3: a mutable object version and a counter of full reads."""
+    state = {"version": (100, 1), "reads": 0}
+
+    def read(s3_path):
+        state["reads"] += 1
+        return [{"read": state["reads"]}]
+
+    monkeypatch.setattr(main, "_pinned", {})
+    monkeypatch.setattr(main, "_parquet_reads", SingleFlight())
+    monkeypatch.setattr(main, "_read_parquet", read)
+    monkeypatch.setattr(main, "_object_version", lambda s3_path: state["version"])
+    return state
+
+
+def test_pinned_object_outlives_read_cache_ttl(pinned_backend):
+    main._pin("s3://bucket/fleet.parquet")
+
+    for _ in range(3):
+        assert main.query_parquet("s3://bucket/fleet.parquet") == [{"read": 1}]
+    assert pinned_backend["reads"] == 1
+
+
+def test_pinned_object_is_reread_when_metadata_changes(pinned_backend):
+    main._pin("s3://bucket/fleet.parquet")
+    pinned_backend["version"] = (120, 2)
+
+    assert main.query_parquet("s3://bucket/fleet.parquet") == [{"read": 2}]
+    assert main.query_parquet("s3://bucket/fleet.parquet") == [{"read": 2}]
+    assert pinned_backend["reads"] == 2
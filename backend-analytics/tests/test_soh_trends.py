@@ -0,0 +1,119 @@
+"""
+Tests for the fleet SoH trend endpoint and its per-file fit cache.
+"""
+import os
+import shutil
+import time
+from pathlib import Path
+
+import duckdb
+import pytest
+
+import main
+
+SOH_DIR = Path(__file__).resolve().parents[2] / "backend" / "data" / "features" / "SoH"
+
+
+@pytest.fixture
+def soh_base(tmp_path, monkeypatch) -> Path:
+    """Local copy of the committed SoH files served through a plain DuckDB connection."""
+    shutil.copytree(SOH_DIR, tmp_path / "SoH")
+    conn = duckdb.connect(":memory:")
+    monkeypatch.setattr(main, "get_connection", lambda: conn)
+    monkeypatch.setattr(main, "get_s3_base", lambda: str(tmp_path))
+    monkeypatch.setattr(main, "_soh_fits", {})
+    return tmp_path
+
+
+@pytest.fixture
+def fit_calls(monkeypatch) -> list[list[str]]:
+    """Record the file list passed to every grouped fit query."""
+    calls = []
+    query = main._query_soh_fits
+
+    def spy(files):
+        calls.append([Path(f).name for f in files])
+        return query(files)
+
+    monkeypatch.setattr(main, "_query_soh_fits", spy)
+    return calls
+
+
+def _touch(path: Path) -> None:
+    """Bump the modification time so the file's version changes."""
+    future = time.time() + 60
+    os.utime(path, (future, future))
+
+
+def test_all_drones_fitted_in_one_query(soh_base, fit_calls):
+    result = main.get_fleet_soh_trends()
+
+    assert result["total_drones"] == 10
+    assert len(fit_calls) == 1 and len(fit_calls[0]) == 10
+    orca001 = result["drones"][0]
+    assert orca001["drone_id"] == "ORCA001"
+    assert orca001["slope"] < 0
+    assert orca001["eol_EFC"] > orca001["current_EFC_lifetime"]
+    assert 0 <= orca001["r2"] <= 1
+    assert orca001["eol_EFC_low"] < orca001["eol_EFC"]
+    assert orca001["eol_EFC_high"] is None or orca001["eol_EFC_high"] > orca001["eol_EFC"]
+
+
+def test_only_changed_file_is_refit(soh_base, fit_calls):
+    main.get_fleet_soh_trends()
+    main.get_fleet_soh_trends()
+    assert len(fit_calls) == 1
+
+    _touch(soh_base / "SoH" / "features_daily_ORCA003_with_SoH.parquet")
+    main.get_fleet_soh_trends()
+
+    assert fit_calls[1:] == [["features_daily_ORCA003_with_SoH.parquet"]]
+
+
+def test_unreadable_file_does_not_fail_other_drones(soh_base, fit_calls):
+    broken = soh_base / "SoH" / "features_daily_ORCA005_with_SoH.parquet"
+    broken.write_bytes(b"not a parquet file")
+
+    result = main.get_fleet_soh_trends()
+
+    expected = [f"ORCA{i:03d}" for i in range(1, 11) if i != 5]
+    assert [d["drone_id"] for d in result["drones"]] == expected
+    # The failure is not cached: only the broken file is retried (batch, then on its own)
+    calls = len(fit_calls)
+    result = main.get_fleet_soh_trends()
+    assert [d["drone_id"] for d in result["drones"]] == expected
+    assert fit_calls[calls:] == [["features_daily_ORCA005_with_SoH.parquet"]] * 2
+
+
+def test_transient_failure_is_retried(soh_base, monkeypatch):
+    query = main._query_soh_fits
+    outage = [True]
+
+    def flaky(files):
+        if outage[0]:
+            raise IOError("HTTP 503")
+        return query(files)
+
+    monkeypatch.setattr(main, "_query_soh_fits", flaky)
+    with pytest.raises(main.HTTPException) as exc:
+        main.get_fleet_soh_trends()
+    assert exc.value.status_code == 404
+
+    outage[0] = False
+    result = main.get_fleet_soh_trends()
+
+    assert result["total_drones"] == 10
+
+
+def test_empty_file_is_cached_as_no_fit(soh_base, fit_calls):
+    empty = soh_base / "SoH" / "features_daily_ORCA007_with_SoH.parquet"
+    staged = soh_base / "empty.parquet"
+    duckdb.sql(f"COPY (SELECT * FROM read_parquet('{empty}') LIMIT 0) TO '{staged}' (FORMAT parquet)")
+    staged.replace(empty)
+    _touch(empty)
+
+    result = main.get_fleet_soh_trends()
+    main.get_fleet_soh_trends()
+
+    assert "ORCA007" not in [d["drone_id"] for d in result["drones"]]
+    assert len(fit_calls) == 1
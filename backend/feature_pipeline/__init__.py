@@ -0,0 +1,10 @@
+"""
+Feature pipeline: derives the daily, lifetime, SoH and fleet feature parquet
+files under data/features from the raw telemetry under data/telemetry.
+
+Run from the backend directory:
+    python -m feature_pipeline [--drone ORCA001] [--workers 4] [--adopt] [--force]
+"""
+from .pipeline import discover_drones, run_pipeline
+
+__all__ = ['discover_drones', 'run_pipeline']
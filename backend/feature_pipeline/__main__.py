@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+CLI entry point: rebuild stale feature files from raw telemetry.
+"""
+import argparse
+import os
+
+from .pipeline import run_pipeline
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(__file__), '../data')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild stale feature parquet files from raw telemetry.')
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help='Directory containing telemetry/ and features/')
+    parser.add_argument('--drone', action='append', dest='drones', help='Drone ID to rebuild (repeatable, e.g. ORCA001)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--force', action='store_true', help='Rebuild every output regardless of content hashes')
+    parser.add_argument('--adopt', action='store_true', help='Allow overwriting existing outputs not produced by the pipeline')
+    args = parser.parse_args()
+
+    try:
+        built = run_pipeline(args.data_dir, drones=args.drones, workers=args.workers, force=args.force, adopt=args.adopt)
+    except ValueError as e:
+        parser.exit(1, f"❌ {e}\n")
+    if not built:
+        print("✅ All feature files up to date")
+        return
+    print(f"🔁 Rebuilt {len(built)} file(s):")
+    for path in built:
+        print(f"   {path}")
+
+
+if __name__ == '__main__':
+    main()
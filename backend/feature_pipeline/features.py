@@ -0,0 +1,155 @@
+"""
+Feature computations for each pipeline stage.
+Output columns match the parquet files served by backend-analytics/main.py.
+"""
+import numpy as np
+import pandas as pd
+
+# Pack layout: 120 cells in series, 10 modules of 12 cells
+CELL_COLS = [f'V{i}' for i in range(1, 121)]
+TEMP_COLS = [f'T{i}_C' for i in range(1, 13)]
+N_MODULES = 10
+CELLS_PER_MODULE = 12
+
+NOMINAL_CAPACITY_AH = 50.0
+SAMPLE_PERIOD_S = 5.0  # Fallback when telemetry has no timestamp index
+MAX_SAMPLE_GAP_S = 60.0  # Longer gaps are idle time, not discharge
+
+# Validation thresholds (same as scripts/ingest_telemetry.py)
+MIN_VOLTAGE = 3.0
+MAX_VOLTAGE = 4.2
+MAX_TEMPERATURE = 60.0
+
+# Flag thresholds
+VOLTAGE_IMBALANCE_MV = 50.0
+THERMAL_RISK_TEMP_C = 45.0
+THERMAL_RISK_DELTA_C = 5.0
+
+# SoH model: capacity fade per EFC at reference temperature, doubling every 10 °C.
+# Fitted to the committed features/SoH curves against their own EFC_day. EFC derived from
+# the raw telemetry here is on a larger scale (see README), so pipeline SoH falls faster.
+SOH_FADE_PER_EFC = 0.00247
+SOH_REFERENCE_TEMP_C = 25.0
+
+# Served daily/ files
+DAILY_COLUMNS = (
+    ['drone_id', 'day_index', 'Ah_discharge_day', 'EFC_day', 'avg_current_A', 'peak_current_A',
+     'avg_cell_voltage_V', 'avg_pack_voltage_V', 'avg_discharge_power_W', 'energy_throughput_Wh']
+    + [f'module_{m}_{name}' for m in range(1, N_MODULES + 1)
+       for name in ('avg_voltage_V', 'avg_power_W', 'power_per_EFC_W')]
+    + ['avg_pack_temp_C', 'max_pack_temp_C', 'min_pack_temp_C', 'max_temp_delta_C']
+)
+
+# Full per-day record kept by the pipeline: daily columns plus the fields the lifetime stage needs
+DAY_RECORD_COLUMNS = DAILY_COLUMNS + [
+    'min_cell_voltage_V', 'max_cell_voltage_V',
+    'avg_module_voltage_spread_mV', 'max_module_voltage_spread_mV',
+    'voltage_imbalance_flag', 'thermal_risk_flag',
+]
+
+LIFETIME_COLUMNS = [
+    'drone_id', 'day_index', 'Ah_discharge_day', 'EFC_day', 'avg_current_A', 'peak_current_A',
+    'avg_cell_voltage_V', 'min_cell_voltage_V', 'max_cell_voltage_V',
+    'avg_module_voltage_spread_mV', 'max_module_voltage_spread_mV',
+    'avg_pack_temp_C', 'max_pack_temp_C', 'max_temp_delta_C',
+    'voltage_imbalance_flag', 'thermal_risk_flag', 'EFC_lifetime',
+]
+
+SOH_COLUMNS = LIFETIME_COLUMNS + ['SoH']
+
+
+def clean_telemetry(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop NaN rows and samples outside the voltage/temperature limits."""
+    df = df.dropna()
+    cells = df[CELL_COLS].to_numpy()
+    mask = ((cells >= MIN_VOLTAGE) & (cells <= MAX_VOLTAGE)).all(axis=1)
+    mask &= (df[TEMP_COLS].to_numpy() <= MAX_TEMPERATURE).all(axis=1)
+    return df[mask]
+
+
+def _sample_durations(df: pd.DataFrame) -> np.ndarray:
+    """Seconds each sample represents, from the timestamp index when available."""
+    if not isinstance(df.index, pd.DatetimeIndex) or len(df) < 2:
+        return np.full(len(df), SAMPLE_PERIOD_S)
+    dt = np.diff(df.index.asi8) / 1e9
+    period = float(np.median(dt))
+    dt = np.where((dt <= 0) | (dt > MAX_SAMPLE_GAP_S), period, dt)
+    return np.append(dt, period)
+
+
+def compute_daily_features(raw: pd.DataFrame, drone_id: str, day_index: int) -> dict:
+    """Reduce one day of raw telemetry to a single record with DAY_RECORD_COLUMNS."""
+    df = clean_telemetry(raw)
+    if df.empty:
+        raise ValueError(f'{drone_id} day {day_index}: no valid samples after cleaning')
+
+    dt = _sample_durations(df)
+    current = df['Current_A'].to_numpy()
+    cells = df[CELL_COLS].to_numpy()
+    module_cells = cells.reshape(len(df), N_MODULES, CELLS_PER_MODULE)
+    modules = module_cells.sum(axis=2)
+    pack_v = cells.sum(axis=1)
+    power = pack_v * current
+
+    discharge = current > 0
+    ah = float((current * dt)[discharge].sum() / 3600)
+    efc = ah / NOMINAL_CAPACITY_AH
+    # Cell voltage spread within each module, per sample
+    spread_mv = (module_cells.max(axis=2) - module_cells.min(axis=2)) * 1000
+    temps = df[TEMP_COLS].to_numpy()
+    temp_delta = temps.max(axis=1) - temps.min(axis=1)
+
+    record = {
+        'drone_id': drone_id,
+        'day_index': int(day_index),
+        'Ah_discharge_day': round(ah, 4),
+        'EFC_day': round(efc, 6),
+        'avg_current_A': round(float(current.mean()), 2),
+        'peak_current_A': round(float(current.max()), 2),
+        'avg_cell_voltage_V': round(float(cells.mean()), 4),
+        'min_cell_voltage_V': round(float(cells.min()), 3),
+        'max_cell_voltage_V': round(float(cells.max()), 3),
+        'avg_pack_voltage_V': round(float(pack_v.mean()), 2),
+        'avg_discharge_power_W': round(float(power[discharge].mean()) if discharge.any() else 0.0, 2),
+        'energy_throughput_Wh': round(float((np.abs(power) * dt).sum() / 3600), 2),
+    }
+    for m in range(N_MODULES):
+        module_power = float((modules[:, m] * current)[discharge].mean()) if discharge.any() else 0.0
+        record[f'module_{m + 1}_avg_voltage_V'] = round(float(modules[:, m].mean()), 2)
+        record[f'module_{m + 1}_avg_power_W'] = round(module_power, 2)
+        record[f'module_{m + 1}_power_per_EFC_W'] = round(module_power / efc, 2) if efc > 0 else 0.0
+    record.update({
+        'avg_module_voltage_spread_mV': round(float(spread_mv.mean()), 2),
+        'max_module_voltage_spread_mV': round(float(spread_mv.max()), 2),
+        'avg_pack_temp_C': round(float(temps.mean()), 2),
+        'max_pack_temp_C': round(float(temps.max()), 2),
+        'min_pack_temp_C': round(float(temps.min()), 2),
+        'max_temp_delta_C': round(float(temp_delta.max()), 2),
+    })
+    record['voltage_imbalance_flag'] = bool(record['max_module_voltage_spread_mV'] > VOLTAGE_IMBALANCE_MV)
+    record['thermal_risk_flag'] = bool(
+        record['max_pack_temp_C'] > THERMAL_RISK_TEMP_C or record['max_temp_delta_C'] > THERMAL_RISK_DELTA_C
+    )
+    return record
+
+
+def build_lifetime(day_records: pd.DataFrame) -> pd.DataFrame:
+    """Per-drone day history with cumulative EFC_lifetime."""
+    df = day_records.sort_values('day_index').reset_index(drop=True)
+    df['EFC_lifetime'] = df['EFC_day'].cumsum().round(4)
+    return df[LIFETIME_COLUMNS]
+
+
+def build_soh(lifetime: pd.DataFrame) -> pd.DataFrame:
+    """Per-drone SoH history from throughput with Arrhenius-style thermal acceleration."""
+    df = lifetime.sort_values('day_index').reset_index(drop=True)
+    accel = np.power(2.0, (df['avg_pack_temp_C'].to_numpy() - SOH_REFERENCE_TEMP_C) / 10.0)
+    fade = np.cumsum(df['EFC_day'].to_numpy() * SOH_FADE_PER_EFC * accel)
+    df['SoH'] = np.clip(1.0 - fade, 0.0, 1.0)
+    return df[SOH_COLUMNS]
+
+
+def build_fleet(per_drone: list[pd.DataFrame], columns: list[str]) -> pd.DataFrame:
+    """Concatenate per-drone histories into one fleet rollup (missing columns become nulls)."""
+    df = pd.concat([d.reindex(columns=columns) for d in per_drone], ignore_index=True)
+    return df.sort_values(['drone_id', 'day_index']).reset_index(drop=True)
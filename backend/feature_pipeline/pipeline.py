@@ -0,0 +1,335 @@
+"""
+Incremental feature DAG from raw telemetry to the served feature parquet files.
+
+    telemetry/<drone>/drone_day_NN.parquet
+      -> features/.pipeline/day_records/features_daily_<ID>_day_NN.parquet  (full per-day record)
+      -> features/daily/features_daily_<ID>_day_NN.parquet                 (served daily columns)
+      -> features/aggregated/features_daily_<ID>_with_lifetime.parquet    (from the day records)
+      -> features/SoH/features_daily_<ID>_with_SoH.parquet
+      -> features/{aggregated,SoH}/features_daily_fleet_with_*.parquet
+
+Every node is keyed by the content hashes of its inputs, so only stale outputs
+are rebuilt. A drone is only rebuilt when its raw telemetry covers every daily
+file already on disk for it, so a partial raw history never truncates existing
+outputs. Existing outputs the pipeline did not produce itself (no manifest
+entry) are never overwritten unless adopt or force is given. Per-drone chains run in parallel in a process pool; the fleet
+rollup runs afterwards in the parent process.
+"""
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+
+from .features import (
+    DAILY_COLUMNS,
+    DAY_RECORD_COLUMNS,
+    LIFETIME_COLUMNS,
+    SOH_COLUMNS,
+    build_fleet,
+    build_lifetime,
+    build_soh,
+    compute_daily_features,
+)
+
+# Bump a stage's version when its computation changes to invalidate its outputs
+STAGE_VERSIONS = {'day': 1, 'daily': 2, 'lifetime': 2, 'soh': 2, 'fleet': 1}
+
+MANIFEST_NAME = '.pipeline_manifest.json'
+RAW_DAY_PATTERN = re.compile(r'^drone_day_(\d+)\.parquet$')
+FLEET_ID = 'fleet'
+
+
+@dataclass
+class Node:
+    """One output file and the inputs it is derived from."""
+    stage: str
+    output: Path
+    inputs: list[Path]
+    build: Callable[[list[Path], Path], None]
+
+
+# --------------------------------------------------------------------------
+# Manifest (content hashes)
+# --------------------------------------------------------------------------
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Content hashes of pipeline files and the input key each output was built from."""
+
+    def __init__(self, data_dir: Path, files: dict | None = None, nodes: dict | None = None):
+        self.data_dir = data_dir
+        self.files = dict(files or {})
+        self.nodes = dict(nodes or {})
+        self._dirty: set[str] = set()
+
+    @classmethod
+    def load(cls, data_dir: Path) -> 'Manifest':
+        path = data_dir / 'features' / MANIFEST_NAME
+        if not path.exists():
+            return cls(data_dir)
+        state = json.loads(path.read_text())
+        return cls(data_dir, state.get('files'), state.get('nodes'))
+
+    def save(self) -> None:
+        path = self.data_dir / 'features' / MANIFEST_NAME
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(json.dumps({'files': self.files, 'nodes': self.nodes}, indent=1, sort_keys=True))
+        os.replace(tmp, path)
+
+    def rel(self, path: Path) -> str:
+        return path.relative_to(self.data_dir).as_posix()
+
+    def file_hash(self, path: Path) -> str:
+        """Content hash of a file, reusing the stored hash while size and mtime are unchanged."""
+        rel = self.rel(path)
+        stat = path.stat()
+        entry = self.files.get(rel)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['sha256']
+        sha = _sha256(path)
+        self.files[rel] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha}
+        self._dirty.add(rel)
+        return sha
+
+    def node_key(self, node: Node) -> str:
+        digest = hashlib.sha256(f'{node.stage}:{STAGE_VERSIONS[node.stage]}'.encode())
+        for path in node.inputs:
+            digest.update(f'\n{self.rel(path)}:{self.file_hash(path)}'.encode())
+        return digest.hexdigest()
+
+    def is_fresh(self, node: Node, key: str) -> bool:
+        entry = self.nodes.get(self.rel(node.output))
+        return (
+            entry is not None
+            and entry['key'] == key
+            and node.output.exists()
+            and self.file_hash(node.output) == entry['sha256']
+        )
+
+    def record(self, node: Node, key: str) -> None:
+        rel = self.rel(node.output)
+        self.nodes[rel] = {'key': key, 'sha256': self.file_hash(node.output)}
+        self._dirty.add(rel)
+
+    def changes(self) -> tuple[dict, dict]:
+        """Entries updated by this instance, for merging results from worker processes."""
+        files = {k: v for k, v in self.files.items() if k in self._dirty}
+        nodes = {k: v for k, v in self.nodes.items() if k in self._dirty}
+        return files, nodes
+
+    def merge(self, files: dict, nodes: dict) -> None:
+        self.files.update(files)
+        self.nodes.update(nodes)
+
+
+# --------------------------------------------------------------------------
+# Node builders
+# --------------------------------------------------------------------------
+
+def _write_parquet(df: pd.DataFrame, output: Path) -> None:
+    """Write atomically so a crash never leaves a half-written output behind."""
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_suffix('.tmp')
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, output)
+
+
+def _daily_day_index(path: Path) -> int:
+    return int(re.search(r'_day_(\d+)\.parquet$', path.name).group(1))
+
+
+def _build_day_record(inputs: list[Path], output: Path) -> None:
+    drone_id = output.name[len('features_daily_'):].split('_day_')[0]
+    record = compute_daily_features(pd.read_parquet(inputs[0]), drone_id, _daily_day_index(output))
+    _write_parquet(pd.DataFrame([record], columns=DAY_RECORD_COLUMNS), output)
+
+
+def _build_daily(inputs: list[Path], output: Path) -> None:
+    _write_parquet(pd.read_parquet(inputs[0], columns=DAILY_COLUMNS), output)
+
+
+def _build_lifetime(inputs: list[Path], output: Path) -> None:
+    day_records = pd.concat([pd.read_parquet(p) for p in inputs], ignore_index=True)
+    _write_parquet(build_lifetime(day_records), output)
+
+
+def _build_soh(inputs: list[Path], output: Path) -> None:
+    _write_parquet(build_soh(pd.read_parquet(inputs[0])), output)
+
+
+def _build_fleet_lifetime(inputs: list[Path], output: Path) -> None:
+    _write_parquet(build_fleet([pd.read_parquet(p) for p in inputs], LIFETIME_COLUMNS), output)
+
+
+def _build_fleet_soh(inputs: list[Path], output: Path) -> None:
+    _write_parquet(build_fleet([pd.read_parquet(p) for p in inputs], SOH_COLUMNS), output)
+
+
+# --------------------------------------------------------------------------
+# DAG
+# --------------------------------------------------------------------------
+
+def _lifetime_path(data_dir: Path, drone_id: str) -> Path:
+    return data_dir / 'features' / 'aggregated' / f'features_daily_{drone_id}_with_lifetime.parquet'
+
+
+def _soh_path(data_dir: Path, drone_id: str) -> Path:
+    return data_dir / 'features' / 'SoH' / f'features_daily_{drone_id}_with_SoH.parquet'
+
+
+def discover_drones(data_dir: Path) -> dict[str, list[tuple[int, Path]]]:
+    """Map drone ID (e.g. ORCA001) to its raw (day_index, path) files, sorted by day."""
+    drones = {}
+    telemetry_dir = data_dir / 'telemetry'
+    if not telemetry_dir.is_dir():
+        return drones
+    for drone_dir in sorted(p for p in telemetry_dir.iterdir() if p.is_dir()):
+        days = []
+        for f in drone_dir.iterdir():
+            match = RAW_DAY_PATTERN.match(f.name)
+            if match:
+                days.append((int(match.group(1)), f))
+        if days:
+            drones[drone_dir.name.upper().replace('-', '')] = sorted(days)
+    return drones
+
+
+def uncovered_days(data_dir: Path, drone_id: str, raw_days: list[tuple[int, Path]]) -> list[int]:
+    """Days with a served daily file on disk but no raw telemetry to rebuild them from."""
+    raw = {day for day, _ in raw_days}
+    on_disk = (data_dir / 'features' / 'daily').glob(f'features_daily_{drone_id}_day_*.parquet')
+    return sorted(day for day in map(_daily_day_index, on_disk) if day not in raw)
+
+
+def drone_nodes(data_dir: Path, drone_id: str, raw_days: list[tuple[int, Path]]) -> list[Node]:
+    """Per-drone chain in topological order: day record -> daily, lifetime -> SoH."""
+    records_dir = data_dir / 'features' / '.pipeline' / 'day_records'
+    daily_dir = data_dir / 'features' / 'daily'
+    nodes = []
+    records = []
+    for day, raw in raw_days:
+        name = f'features_daily_{drone_id}_day_{str(day).zfill(2)}.parquet'
+        nodes.append(Node('day', records_dir / name, [raw], _build_day_record))
+        nodes.append(Node('daily', daily_dir / name, [records_dir / name], _build_daily))
+        records.append(records_dir / name)
+    lifetime = _lifetime_path(data_dir, drone_id)
+    nodes.append(Node('lifetime', lifetime, records, _build_lifetime))
+    nodes.append(Node('soh', _soh_path(data_dir, drone_id), [lifetime], _build_soh))
+    return nodes
+
+
+def fleet_nodes(data_dir: Path) -> list[Node]:
+    """Fleet rollups over every per-drone file on disk, including drones without raw telemetry."""
+    def per_drone(folder: str, suffix: str) -> list[Path]:
+        fleet_name = f'features_daily_{FLEET_ID}_{suffix}.parquet'
+        return sorted(
+            p for p in (data_dir / 'features' / folder).glob(f'features_daily_*_{suffix}.parquet')
+            if p.name != fleet_name
+        )
+
+    nodes = []
+    lifetime_inputs = per_drone('aggregated', 'with_lifetime')
+    if lifetime_inputs:
+        nodes.append(Node('fleet', _lifetime_path(data_dir, FLEET_ID), lifetime_inputs, _build_fleet_lifetime))
+    soh_inputs = per_drone('SoH', 'with_SoH')
+    if soh_inputs:
+        nodes.append(Node('fleet', _soh_path(data_dir, FLEET_ID), soh_inputs, _build_fleet_soh))
+    return nodes
+
+
+def _execute(nodes: list[Node], manifest: Manifest, force: bool) -> list[str]:
+    """Run stale nodes in order; return the outputs that were rebuilt."""
+    built = []
+    for node in nodes:
+        key = manifest.node_key(node)
+        if not force and manifest.is_fresh(node, key):
+            continue
+        node.build(node.inputs, node.output)
+        manifest.record(node, key)
+        built.append(manifest.rel(node.output))
+    return built
+
+
+def _run_drone(
+    data_dir: Path, drone_id: str, raw_days: list[tuple[int, Path]], files: dict, nodes: dict, force: bool
+) -> tuple[list[str], dict, dict]:
+    """Worker entry point: bring one drone's chain up to date."""
+    manifest = Manifest(data_dir, files, nodes)
+    built = _execute(drone_nodes(data_dir, drone_id, raw_days), manifest, force)
+    return (built, *manifest.changes())
+
+
+def foreign_outputs(nodes: list[Node], manifest: Manifest) -> list[Path]:
+    """Outputs already on disk that have no manifest entry, i.e. were not produced by the pipeline."""
+    return [n.output for n in nodes if n.output.exists() and manifest.rel(n.output) not in manifest.nodes]
+
+
+def run_pipeline(
+    data_dir: Path,
+    drones: list[str] | None = None,
+    workers: int | None = None,
+    force: bool = False,
+    adopt: bool = False,
+) -> list[str]:
+    """Rebuild stale feature files under data_dir/features; return rebuilt paths relative to data_dir.
+    
+    adopt allows overwriting existing outputs the pipeline did not produce; force implies adopt.
+    """
+    data_dir = Path(data_dir).resolve()
+    manifest = Manifest.load(data_dir)
+    targets = discover_drones(data_dir)
+    if drones:
+        missing = set(drones) - set(targets)
+        if missing:
+            raise ValueError(f"No raw telemetry for: {', '.join(sorted(missing))}")
+        targets = {d: targets[d] for d in drones}
+    partial = {d: uncovered_days(data_dir, d, raw_days) for d, raw_days in targets.items()}
+    partial = {d: days for d, days in partial.items() if days}
+    if partial:
+        detail = '; '.join(f"{d} days {', '.join(map(str, days))}" for d, days in sorted(partial.items()))
+        raise ValueError(f"Raw telemetry does not cover existing daily files ({detail})")
+    if not (force or adopt):
+        planned = [n for d, raw_days in targets.items() for n in drone_nodes(data_dir, d, raw_days)]
+        foreign = foreign_outputs(planned + fleet_nodes(data_dir), manifest)
+        if foreign:
+            shown = ', '.join(manifest.rel(p) for p in foreign[:3])
+            more = f' and {len(foreign) - 3} more' if len(foreign) > 3 else ''
+            raise ValueError(
+                f"Refusing to overwrite {len(foreign)} output(s) not produced by the pipeline "
+                f"({shown}{more}); pass --adopt to take them over"
+            )
+
+    built = []
+    if workers == 1 or len(targets) <= 1:
+        for drone_id, raw_days in targets.items():
+            drone_built, files, nodes = _run_drone(data_dir, drone_id, raw_days, manifest.files, manifest.nodes, force)
+            manifest.merge(files, nodes)
+            built += drone_built
+    elif targets:
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(targets))) as pool:
+            futures = [
+                pool.submit(_run_drone, data_dir, drone_id, raw_days, manifest.files, manifest.nodes, force)
+                for drone_id, raw_days in targets.items()
+            ]
+            for future in futures:
+                drone_built, files, nodes = future.result()
+                manifest.merge(files, nodes)
+                built += drone_built
+
+    built += _execute(fleet_nodes(data_dir), manifest, force)
+    manifest.save()
+    return built